@@ -1,27 +1,52 @@
-from typing import Dict, List, Optional, Tuple
-import re
-import requests
-from time import sleep
-from .core import EmissionCalculator
-from geopy.distance import geodesic
+from typing import Dict
+import logging
+from .core import get_calculator, haversine_km
+from .geocode import get_geocoder
+
+logger = logging.getLogger(__name__)
+
+# Replies recognised at each conversation stage
+_YES = frozenset({'yes', 'y', 'sure', 'okay'})
+_RESTART = frozenset({'restart', 'new', 'start over'})
+_ANOTHER = frozenset({'1', 'yes', 'calculate', 'another'})
+_RECOMMEND = frozenset({'2', 'recommendations', 'eco'})
+_END = frozenset({'3', 'end', 'quit', 'exit'})
+
+_LOCATION_NOT_FOUND = "I couldn't find that location. Please try entering a different city name or coordinates (like '51.5074,-0.1278'):"
+
+_MATERIAL_OPTIONS = """1. Cardboard (Paper Board)
+2. Plastic
+3. Paper
+4. Mixed Materials
+
+Enter the number or material name:"""
 
 class RecommendationChatbot:
+    # Valid materials mapping
+    materials_mapping = {
+        '1': 'Paper and board: board',
+        'cardboard': 'Paper and board: board',
+        'board': 'Paper and board: board',
+        '2': 'Plastics: average plastics',
+        'plastic': 'Plastics: average plastics',
+        '3': 'Paper and board: paper',
+        'paper': 'Paper and board: paper',
+        '4': 'Paper and board: mixed',
+        'mixed': 'Paper and board: mixed',
+        'mixed materials': 'Paper and board: mixed'
+    }
+
     def __init__(self):
-        self.calculator = EmissionCalculator()
+        self.calculator = get_calculator()
+        self.geocoder = get_geocoder()
         self.conversation_state = {}
-        
-        # Define valid materials mapping
-        self.materials_mapping = {
-            '1': 'Paper and board: board',
-            'cardboard': 'Paper and board: board',
-            'board': 'Paper and board: board',
-            '2': 'Plastics: average plastics',
-            'plastic': 'Plastics: average plastics',
-            '3': 'Paper and board: paper',
-            'paper': 'Paper and board: paper',
-            '4': 'Paper and board: mixed',
-            'mixed': 'Paper and board: mixed',
-            'mixed materials': 'Paper and board: mixed'
+        self._handlers = {
+            'welcome': self._handle_welcome,
+            'origin': self._handle_origin,
+            'destination': self._handle_destination,
+            'weight': self._handle_weight,
+            'material': self._handle_material,
+            'calculation': self._handle_calculation
         }
 
     def initialize_conversation(self, session_id: str) -> str:
@@ -52,137 +77,71 @@ Would you like to calculate emissions for a shipment? (yes/no)"""
         state = self.conversation_state[session_id]
         message = message.strip()  # Don't convert to lowercase here
         
-        if state['stage'] == 'welcome':
-            if message.lower() in ['yes', 'y', 'sure', 'okay']:
-                state['stage'] = 'origin'
-                return "Great! Let's start with the origin location. Please enter a city name or coordinates (latitude,longitude):"
-            else:
-                return "I understand. When you're ready to calculate shipping emissions, just say 'start'."
-        
-        elif state['stage'] == 'origin':
-            location = self._parse_location(message)
-            if location:
-                state['origin'] = location
-                state['stage'] = 'destination'
-                lat, lon = location
-                return f"Perfect! I found the coordinates ({lat:.6f}, {lon:.6f}). Now, please provide the destination location (city name or coordinates):"
-            else:
-                return "I couldn't find that location. Please try entering a different city name or coordinates (like '51.5074,-0.1278'):"
-        
-        elif state['stage'] == 'destination':
-            location = self._parse_location(message)
-            if location:
-                state['destination'] = location
-                state['stage'] = 'weight'
-                lat, lon = location
-                return f"Great! I found the coordinates ({lat:.6f}, {lon:.6f}). How much does your shipment weigh (in kg)?"
-            else:
-                return "I couldn't find that location. Please try entering a different city name or coordinates (like '51.5074,-0.1278'):"
-        
-        elif state['stage'] == 'weight':
-            try:
-                weight = float(message.replace('kg', '').strip())
-                if weight <= 0:
-                    return "The weight must be greater than 0. Please enter a valid weight in kg:"
-                state['weight'] = weight
-                state['stage'] = 'material'
-                return """What packaging material would you like to use? Choose from:
-1. Cardboard (Paper Board)
-2. Plastic
-3. Paper
-4. Mixed Materials
-
-Enter the number or material name:"""
-            except ValueError:
-                return "Please enter a valid number for the weight in kg:"
-        
-        elif state['stage'] == 'material':
-            # Handle material selection
-            material_input = message.lower().strip()
-            selected_material = self.materials_mapping.get(material_input)
-            
-            if selected_material:
-                state['material'] = selected_material
-                return self._calculate_and_respond(session_id)
-            else:
-                return """I didn't recognize that material. Please choose from:
-1. Cardboard (Paper Board)
-2. Plastic
-3. Paper
-4. Mixed Materials
-
-Enter the number or material name:"""
+        handler = self._handlers.get(state['stage'])
+        if handler:
+            return handler(session_id, state, message, message.lower())
+
+    def _handle_welcome(self, session_id: str, state: Dict, message: str, lower: str) -> str:
+        if lower in _YES:
+            state['stage'] = 'origin'
+            return "Great! Let's start with the origin location. Please enter a city name or coordinates (latitude,longitude):"
+        else:
+            return "I understand. When you're ready to calculate shipping emissions, just say 'start'."
+
+    def _handle_origin(self, session_id: str, state: Dict, message: str, lower: str) -> str:
+        location = self.geocoder.parse_location(message)
+        if location:
+            state['origin'] = location
+            state['stage'] = 'destination'
+            lat, lon = location
+            return f"Perfect! I found the coordinates ({lat:.6f}, {lon:.6f}). Now, please provide the destination location (city name or coordinates):"
+        else:
+            return _LOCATION_NOT_FOUND
+
+    def _handle_destination(self, session_id: str, state: Dict, message: str, lower: str) -> str:
+        location = self.geocoder.parse_location(message)
+        if location:
+            state['destination'] = location
+            state['stage'] = 'weight'
+            lat, lon = location
+            return f"Great! I found the coordinates ({lat:.6f}, {lon:.6f}). How much does your shipment weigh (in kg)?"
+        else:
+            return _LOCATION_NOT_FOUND
+
+    def _handle_weight(self, session_id: str, state: Dict, message: str, lower: str) -> str:
+        try:
+            weight = float(message.replace('kg', '').strip())
+            if weight <= 0:
+                return "The weight must be greater than 0. Please enter a valid weight in kg:"
+            state['weight'] = weight
+            state['stage'] = 'material'
+            return "What packaging material would you like to use? Choose from:\n" + _MATERIAL_OPTIONS
+        except ValueError:
+            return "Please enter a valid number for the weight in kg:"
+
+    def _handle_material(self, session_id: str, state: Dict, message: str, lower: str) -> str:
+        # Handle material selection
+        selected_material = self.materials_mapping.get(lower)
         
-        elif state['stage'] == 'calculation':
-            if message.lower() in ['restart', 'new', 'start over']:
-                return self.initialize_conversation(session_id)
-            elif message.lower() in ['1', 'yes', 'calculate', 'another']:
-                return self.initialize_conversation(session_id)
-            elif message.lower() in ['2', 'recommendations', 'eco']:
-                return self._get_eco_recommendations(state)
-            elif message.lower() in ['3', 'end', 'quit', 'exit']:
-                return "Thank you for using the Carbon Footprint Calculator! Have a great day! 👋"
-            else:
-                return """Please choose an option:
+        if selected_material:
+            state['material'] = selected_material
+            return self._calculate_and_respond(session_id)
+        else:
+            return "I didn't recognize that material. Please choose from:\n" + _MATERIAL_OPTIONS
+
+    def _handle_calculation(self, session_id: str, state: Dict, message: str, lower: str) -> str:
+        if lower in _RESTART or lower in _ANOTHER:
+            return self.initialize_conversation(session_id)
+        elif lower in _RECOMMEND:
+            return self._get_eco_recommendations(state)
+        elif lower in _END:
+            return "Thank you for using the Carbon Footprint Calculator! Have a great day! 👋"
+        else:
+            return """Please choose an option:
 1. Calculate another shipment
 2. Get eco-friendly recommendations
 3. End conversation"""
 
-    def _parse_location(self, location_str: str) -> Optional[Tuple[float, float]]:
-        """Parse location string into coordinates."""
-        # First, check if it's already in coordinate format
-        coord_pattern = r'^(-?\d+\.?\d*),\s*(-?\d+\.?\d*)$'
-        match = re.match(coord_pattern, location_str)
-        if match:
-            return (float(match.group(1)), float(match.group(2)))
-        
-        # If not coordinates, try to geocode the location name
-        try:
-            coordinates = self._geocode_location(location_str)
-            if coordinates:
-                return coordinates
-        except Exception as e:
-            print(f"Geocoding error: {e}")
-            return None
-        
-        return None
-
-    def _geocode_location(self, location_name: str) -> Optional[Tuple[float, float]]:
-        """Convert location name to coordinates using Nominatim API."""
-        # Add delay to respect Nominatim's usage policy
-        sleep(1)
-        
-        try:
-            # Construct the API URL
-            base_url = "https://nominatim.openstreetmap.org/search"
-            params = {
-                'q': location_name,
-                'format': 'json',
-                'limit': 1,
-                'accept-language': 'en'
-            }
-            
-            # Add user agent to comply with Nominatim's usage policy
-            headers = {
-                'User-Agent': 'CarbonFootprintCalculator/1.0'
-            }
-            
-            response = requests.get(base_url, params=params, headers=headers)
-            response.raise_for_status()
-            
-            results = response.json()
-            
-            if results:
-                # Get the first result
-                location = results[0]
-                return (float(location['lat']), float(location['lon']))
-            
-            return None
-
-        except requests.exceptions.RequestException as e:
-            print(f"Error during geocoding: {e}")
-            return None
-    
     def _calculate_and_respond(self, session_id: str) -> str:
         """Calculate emissions and provide recommendations."""
         state = self.conversation_state[session_id]
@@ -193,7 +152,7 @@ Enter the number or material name:"""
                 raise ValueError("Missing required information for calculation")
 
             # Calculate distance
-            distance = geodesic(state['origin'], state['destination']).kilometers
+            distance = haversine_km(state['origin'], state['destination'])
             
             # Calculate time (assuming average speed of 60 km/h)
             time_hours = distance / 60
@@ -232,7 +191,7 @@ Would you like to:
             return response
             
         except Exception as e:
-            print(f"Calculation error: {e}")  # For debugging
+            logger.warning("Calculation error: %s", e)
             return f"I encountered an error while calculating: {str(e)}\nWould you like to try again? (yes/no)"
 
     def _get_eco_recommendations(self, state: Dict) -> str:
@@ -1,23 +1,30 @@
 import click
+import pandas as pd
 from rich.console import Console
 from rich.table import Table
-from .core import EmissionCalculator
+from .core import get_calculator
+from .geocode import get_geocoder
 
 console = Console()
 
-@click.command()
-@click.option('--origin', required=True, help='Origin coordinates (lat,lon)')
-@click.option('--destination', required=True, help='Destination coordinates (lat,lon)')
+@click.group()
+def cli():
+    """Carbon footprint calculator for e-commerce shipments."""
+
+@cli.command()
+@click.option('--origin', required=True, help='Origin coordinates (lat,lon) or place name')
+@click.option('--destination', required=True, help='Destination coordinates (lat,lon) or place name')
 @click.option('--weight', required=True, type=float, help='Shipment weight in kg')
 @click.option('--material', default='Cardboard', help='Packaging material')
 def calculate(origin: str, destination: str, weight: float, material: str):
     """Calculate carbon emissions for a shipment."""
     try:
-        # Parse coordinates
-        origin_coords = tuple(map(float, origin.split(',')))
-        dest_coords = tuple(map(float, destination.split(',')))
+        # Parse coordinates, geocoding any place names concurrently
+        origin_coords, dest_coords = get_geocoder().parse_many([origin, destination])
+        if origin_coords is None or dest_coords is None:
+            raise ValueError("Could not resolve origin or destination location")
         
-        calculator = EmissionCalculator()
+        calculator = get_calculator()
         result = calculator.calculate_emissions(
             origin_coords,
             dest_coords,
@@ -48,5 +55,27 @@ def calculate(origin: str, destination: str, weight: float, material: str):
     except Exception as e:
         console.print(f"[red]Error:[/red] {str(e)}")
 
+@cli.command()
+@click.option('--input', 'input_path', required=True, type=click.Path(exists=True, dir_okay=False),
+              help='CSV with origin_lat,origin_lon,dest_lat,dest_lon,weight[,material] columns')
+@click.option('--output', 'output_path', default='-', type=click.Path(dir_okay=False),
+              help='Output CSV path (default: stdout)')
+@click.option('--mode', default='road', type=click.Choice(['road', 'rail', 'sea', 'air']),
+              help='Transport mode for every shipment')
+def batch(input_path: str, output_path: str, mode: str):
+    """Calculate carbon emissions for a CSV of shipments."""
+    try:
+        shipments = pd.read_csv(input_path)
+        result = get_calculator().calculate_batch_emissions(shipments, mode=mode)
+        
+        if output_path == '-':
+            click.echo(result.to_csv(index=False), nl=False)
+        else:
+            result.to_csv(output_path, index=False)
+            console.print(f"Wrote {len(result)} shipments to {output_path}")
+        
+    except Exception as e:
+        console.print(f"[red]Error:[/red] {str(e)}")
+
 if __name__ == '__main__':
-    calculate()
+    cli()
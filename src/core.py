@@ -1,8 +1,99 @@
 from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from itertools import permutations
 from typing import Dict, List, Optional, Tuple
+import hashlib
+import logging
+import math
+import os
+import pickle
+import re
+import tempfile
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from geopy.distance import geodesic
+
+logger = logging.getLogger(__name__)
+
+# Prefer the Rust-based calamine Excel reader when installed and supported
+# by this pandas version (2.2+); otherwise pandas falls back to openpyxl
+try:
+    import python_calamine  # noqa: F401
+    _EXCEL_ENGINE = 'calamine' if tuple(map(int, pd.__version__.split('.')[:2])) >= (2, 2) else None
+except ImportError:
+    _EXCEL_ENGINE = None
+
+# Column types shared by the DB2 emission factor sheets, so pandas skips inference.
+# The text columns repeat a handful of values across thousands of rows, so they
+# are stored as categoricals: one copy of each distinct string plus small codes.
+# The GHG factor column is left to inference and coerced after loading, so a
+# blank or "n/a" factor becomes NaN instead of failing the whole load
+_FACTOR_SHEET_DTYPES = {
+    'Scope': 'category',
+    'Level 1': 'category',
+    'Level 2': 'category',
+    'Level 3': 'category',
+    'Level 4': 'category',
+    'Column Text': 'category',
+    'UOM': 'category',
+    'GHG/Unit': 'category'
+}
+
+EARTH_RADIUS_KM = 6371.0
+
+# The six axis-aligned orientations of a box, as index permutations of (width, length, height)
+_BOX_ROTATIONS = np.array(list(permutations(range(3))))
+# Slack added before flooring box counts, so e.g. 2.0 m / 0.4 m counts 5 boxes, not 4
+_FIT_TOLERANCE = 1e-9
+
+# GHG/Unit of rows giving the full CO2e factor; other rows hold single-gas
+# components (CH4, N2O, CO2) or energy use (kWh) and must not be used as factors
+_TOTAL_GHG_UNIT = 'kg CO2e'
+
+# Keyword patterns used to classify rows of the reference sheets
+_DELIVERY_RE = re.compile(r'delivery', re.I)
+_WTT_RE = re.compile(r'WTT')
+_PAPER_BOARD_RE = re.compile(r'paper|board', re.I)
+_WASTE_RE = re.compile(r'waste|disposal', re.I)
+
+def _fits(space: Tuple[float, float, float], box: Tuple[float, float, float]) -> Tuple[int, int, int]:
+    """Boxes of a fixed orientation that fit along each axis of a space."""
+    return tuple(int(space[i] / box[i] + _FIT_TOLERANCE) for i in range(3))
+
+def _guillotine_count(space: Tuple[float, float, float], oriented: Tuple[float, float, float]) -> int:
+    """Boxes in a block of one orientation plus those re-packed into the
+    three slabs left beside, behind and above it."""
+    rows, columns, layers = _fits(space, oriented)
+    if not (rows and columns and layers):
+        return 0
+    used_w, used_l = rows * oriented[0], columns * oriented[1]
+    return (
+        rows * columns * layers
+        + _guillotine_fill((round(space[0] - used_w, 6), space[1], space[2]), oriented)
+        + _guillotine_fill((used_w, round(space[1] - used_l, 6), space[2]), oriented)
+        + _guillotine_fill((used_w, used_l, round(space[2] - layers * oriented[2], 6)), oriented)
+    )
+
+@lru_cache(maxsize=4096)
+def _guillotine_fill(space: Tuple[float, float, float], box: Tuple[float, float, float]) -> int:
+    """Most identical boxes that fit in a (width, length, height) space,
+    trying every orientation of the box."""
+    return max(_guillotine_count(space, oriented) for oriented in set(permutations(box)))
+
+def haversine_km(origin: Tuple[float, float], destination: Tuple[float, float]) -> float:
+    """Great-circle distance in km between two (lat, lon) points."""
+    lat1, lon1 = map(math.radians, origin)
+    lat2, lon2 = map(math.radians, destination)
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+def haversine_km_array(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Vectorized haversine_km over arrays of coordinates in degrees."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
 
 @dataclass
 class TransportSegment:
@@ -24,6 +115,7 @@ class LoadingCapacity:
     rows: int
     columns: int
     layers: int
+    extra_boxes: int  # boxes re-oriented into the space left around the main block
     utilization_percentage: float
     remaining_space: float
 
@@ -38,6 +130,11 @@ class EmissionResult:
     box_info: BoxDimensions
     loading_info: Dict[str, LoadingCapacity]  # vehicle type -> loading capacity
 
+    @property
+    def vehicle(self) -> str:
+        """Vehicles used, in segment order."""
+        return ' → '.join(segment.vehicle for segment in self.segments)
+
 @dataclass
 class RouteOption:
     name: str
@@ -48,10 +145,57 @@ class RouteOption:
     estimated_emissions: float
     cost_factor: float  # Relative cost (1.0 = standard)
 
+@dataclass(frozen=True)
+class FactorRow:
+    level2: str
+    level3: str
+    uom: str            # lowercased unit of measure
+    ghg_unit: str       # what the factor measures, e.g. 'kg CO2e' or a single-gas component
+    ghg: float          # GHG Conversion Factor 2024, NaN when missing
+    weight_mult: float  # converts kg to the UOM's weight unit (1e-3 for tonnes)
+
 class EmissionCalculator:
+    # Vehicle categories (Level 2 of the delivery sheet) available to each mode
+    MODE_VEHICLE_TYPES = {
+        'road': ('Vans', 'HGV (all diesel)', 'HGV refrigerated (all diesel)',
+                 'HGVs refrigerated (all diesel)'),
+        'sea': ('Cargo ship', 'Sea tanker'),
+        'air': ('Freight flights',),
+        'rail': ('Rail',)
+    }
+
+    # Load space (a key of vehicle_dimensions) used for each vehicle category
+    VEHICLE_CONTAINERS = {
+        'Vans': 'Van - Class III',
+        'HGV (all diesel)': 'Truck - Large',
+        'HGV refrigerated (all diesel)': 'Truck - Large',
+        'HGVs refrigerated (all diesel)': 'Truck - Large',
+        'Rail': 'Container - 40ft',
+        'Cargo ship': 'Container - 40ft',
+        'Sea tanker': 'Container - 40ft',
+        'Freight flights': 'Aircraft Container'
+    }
+
+    # Common material names mapped to database categories
+    _MATERIAL_MAP = {
+        'cardboard': 'Paper and board: board',
+        'paper': 'Paper and board: paper',
+        'mixed paper': 'Paper and board: mixed',
+        'plastic': 'Plastics: average plastics',
+        'plastic film': 'Plastics: average plastic film',
+        'plastic rigid': 'Plastics: average plastic rigid',
+        'metal': 'Metal: scrap metal',
+        'aluminum': 'Metal: aluminium cans and foil (excl. forming)',
+        'steel': 'Metal: steel cans',
+        'glass': 'Glass',
+        'wood': 'Wood'
+    }
+
     def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
         self._load_data()
+        self._emissions_cache = lru_cache(maxsize=2048)(self._calculate_emissions_uncached)
+        self._nearest_hub_cache = lru_cache(maxsize=4096)(self._nearest_hub)
         
         # Standard container/vehicle dimensions in meters
         self.vehicle_dimensions = {
@@ -91,44 +235,210 @@ class EmissionCalculator:
         }
     
     def _load_data(self) -> None:
-        """Load all database sheets from DB2.xlsx into memory."""
+        """Load the emission factor sheets into memory, shared across instances."""
         try:
-            # Load vehicle emissions from DB1
-            self.vehicle_emissions = pd.read_excel(
-                self.data_dir / "DB1_vehicle_emissions.xlsx"
-            )
+            (
+                self.materials,
+                self.waste_methods,
+                self.delivery_modes
+            ) = self._load_tables(self.data_dir.resolve())
             
-            # Load all other data from DB2.xlsx with different sheets
-            db2_path = self.data_dir / "DB2.xlsx"
-            
-            # Load all sheets from DB2.xlsx
-            self.materials = pd.read_excel(db2_path, sheet_name="Sheet1")
-            self.waste_methods = pd.read_excel(db2_path, sheet_name="Sheet2")
-            self.delivery_modes = pd.read_excel(db2_path, sheet_name="Sheet3")
+            # Freight hubs used to route sea and air legs, as (lat, lon) arrays
+            self._hubs = {
+                'port': self._load_hubs(self.data_dir.resolve() / "ports.csv"),
+                'airport': self._load_hubs(self.data_dir.resolve() / "airports.csv")
+            }
             
-            # Debug: Print available materials
-            print("\nAvailable materials in Sheet1:")
-            print(self.materials['Level 2'].dropna().unique())
-            print(self.materials['Level 3'].dropna().unique())
+            self._build_indexes()
             
         except FileNotFoundError as e:
             raise RuntimeError(f"Failed to load database files: {e}")
 
+    @cached_property
+    def vehicle_emissions(self) -> pd.DataFrame:
+        """Vehicle emissions from DB1, read on first access since calculations don't use it."""
+        try:
+            return self._load_vehicle_emissions(self.data_dir.resolve())
+        except FileNotFoundError as e:
+            raise RuntimeError(f"Failed to load database files: {e}")
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _load_vehicle_emissions(cls, data_dir: Path) -> pd.DataFrame:
+        vehicle_emissions, = cls._read_excel_cached(
+            data_dir / "DB1_vehicle_emissions.xlsx", [0]
+        )
+        return vehicle_emissions
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _load_hubs(path: Path) -> np.ndarray:
+        """Read a hub table (name, lat, lon) as an (N, 2) array of coordinates."""
+        return pd.read_csv(path, usecols=['lat', 'lon'])[['lat', 'lon']].to_numpy(dtype=np.float64)
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _load_tables(cls, data_dir: Path) -> Tuple[pd.DataFrame, ...]:
+        """Read the emission factor tables once per data directory.
+        
+        The tables are read-only at runtime, so every calculator built on the
+        same directory shares the same DataFrames.
+        """
+        # Load materials, waste methods and delivery modes from DB2.xlsx
+        materials, waste_methods, delivery_modes = cls._read_excel_cached(
+            data_dir / "DB2.xlsx", ["Sheet1", "Sheet2", "Sheet3"], dtype=_FACTOR_SHEET_DTYPES
+        )
+        
+        for df in (materials, waste_methods, delivery_modes):
+            df['_ghg_num'] = pd.to_numeric(df['GHG Conversion Factor 2024'], errors='coerce')
+        
+        return materials, waste_methods, delivery_modes
+
+    def _build_indexes(self) -> None:
+        """Precompute plain Python lookups so calculations avoid pandas entirely."""
+        mode_by_type = {
+            vehicle_type.lower(): mode
+            for mode, vehicle_types in self.MODE_VEHICLE_TYPES.items()
+            for vehicle_type in vehicle_types
+        }
+        
+        # Delivery vehicles (excluding well-to-tank factors) grouped by mode;
+        # only full kg CO2e factors are candidates
+        vehicles_by_mode = {mode: [] for mode in self.MODE_VEHICLE_TYPES}
+        delivery_rows = self._factor_rows(self.delivery_modes)
+        for level1, row in zip(self.delivery_modes['Level 1'], delivery_rows):
+            mode = mode_by_type.get(row.level2.lower())
+            if (mode and row.ghg_unit == _TOTAL_GHG_UNIT
+                    and _DELIVERY_RE.search(str(level1))
+                    and not _WTT_RE.search(row.level2)):
+                vehicles_by_mode[mode].append(row)
+        
+        # Vehicle selection does not depend on distance or weight, so pick the
+        # lowest-emission vehicle of each mode up front (missing factors rank last)
+        self._best_vehicle_by_mode = {
+            mode: rows[int(np.argmin(np.nan_to_num(
+                np.array([row.ghg for row in rows], dtype=np.float64), nan=np.inf
+            )))]
+            for mode, rows in vehicles_by_mode.items()
+            if rows
+        }
+        
+        # Material rows with their lowercased names for matching, plus resolved
+        # rows by standardized name, prefilled for every common material name
+        self._material_factors = [
+            (row.level2.lower(), row.level3.lower(), row)
+            for row in self._factor_rows(self.materials)
+        ]
+        self._material_rows = {}
+        for std_material in set(self._MATERIAL_MAP.values()):
+            material_row = self._find_material(std_material)
+            if material_row is not None:
+                self._material_rows[std_material] = material_row
+        
+        # The waste method does not depend on the material, so resolve it once:
+        # prefer a paper/board disposal route, then any general waste route
+        waste_rows = self._factor_rows(self.waste_methods)
+        self._waste_row = next(
+            (row for row in waste_rows
+             if _PAPER_BOARD_RE.search(row.level2) or _PAPER_BOARD_RE.search(row.level3)),
+            next((row for row in waste_rows if _WASTE_RE.search(row.level2)), None)
+        )
+
+    @staticmethod
+    def _factor_rows(df: pd.DataFrame) -> List[FactorRow]:
+        """Convert an emission factor sheet into a list of FactorRow."""
+        def text(value) -> str:
+            return value if isinstance(value, str) else ''
+        
+        return [
+            FactorRow(
+                level2=text(level2),
+                level3=text(level3),
+                uom=text(uom).lower(),
+                ghg_unit=text(ghg_unit),
+                ghg=float(ghg),
+                weight_mult=1e-3 if 'tonne' in text(uom).lower() else 1.0
+            )
+            for level2, level3, uom, ghg_unit, ghg in zip(
+                df['Level 2'], df['Level 3'], df['UOM'], df['GHG/Unit'], df['_ghg_num']
+            )
+        ]
+
+    @staticmethod
+    def _read_excel_cached(
+        path: Path,
+        sheet_names: List,
+        dtype: Optional[Dict[str, str]] = None
+    ) -> List[pd.DataFrame]:
+        """Read Excel sheets, reusing pickled copies while the workbook is unchanged."""
+        # Key the cache on the workbook's content and the requested dtypes, so
+        # checkouts or copies that only touch the mtime still hit the cache
+        digest = hashlib.sha1(path.read_bytes() + repr(dtype).encode()).hexdigest()[:16]
+        cache_dir = path.parent / ".cache"
+        cache_paths = [
+            cache_dir / f"{path.stem}_{name}_{digest}.pkl" for name in sheet_names
+        ]
+        
+        # Parsing XLSX is slow, so reuse the cached frames when present; an
+        # unreadable pickle is treated as a miss and rewritten below
+        if all(p.exists() for p in cache_paths):
+            try:
+                return [pd.read_pickle(p) for p in cache_paths]
+            except (EOFError, pickle.UnpicklingError, OSError) as e:
+                logger.warning("Ignoring unreadable sheet cache for %s: %s", path.name, e)
+        
+        # Parse all requested sheets in one pass so the workbook is opened once
+        sheets = pd.read_excel(
+            path, sheet_name=list(sheet_names), engine=_EXCEL_ENGINE, dtype=dtype
+        )
+        frames = [sheets[name] for name in sheet_names]
+        try:
+            cache_dir.mkdir(exist_ok=True)
+            for name, df, cache_path in zip(sheet_names, frames, cache_paths):
+                # Write to a temporary file and rename it into place, so a
+                # concurrent reader or a crash never leaves a partial pickle
+                fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+                os.close(fd)
+                os.chmod(tmp_path, 0o644)  # mkstemp creates files owner-only
+                try:
+                    df.to_pickle(tmp_path, protocol=5)
+                    os.replace(tmp_path, cache_path)
+                finally:
+                    Path(tmp_path).unlink(missing_ok=True)
+                
+                # Drop pickles of earlier versions of this sheet
+                for stale in cache_dir.glob(f"{path.stem}_{name}_*.pkl"):
+                    if stale != cache_path:
+                        stale.unlink(missing_ok=True)
+        except OSError:
+            pass  # Caching is best effort; a read-only data dir still works
+        return frames
+
     def calculate_box_loading(
         self,
         box_dimensions: BoxDimensions,
         vehicle_type: str
     ) -> LoadingCapacity:
-        """Calculate how many boxes can fit in the vehicle."""
-        vehicle_dim = self.vehicle_dimensions[vehicle_type]
+        """Calculate how many boxes fit in the vehicle, trying every box orientation."""
+        vehicle_dim = self.vehicle_dimensions[
+            self.VEHICLE_CONTAINERS.get(vehicle_type, vehicle_type)
+        ]
+        
+        # Boxes that fit along each vehicle axis for all six rotations at once
+        space = np.array([vehicle_dim['width'], vehicle_dim['length'], vehicle_dim['height']])
+        box = np.array([box_dimensions.width, box_dimensions.length, box_dimensions.height])
+        rotated = box[_BOX_ROTATIONS]
+        fits = np.floor(space / rotated + _FIT_TOLERANCE)
         
-        # Calculate maximum number of boxes that can fit in each dimension
-        rows = int(vehicle_dim['width'] / box_dimensions.width)
-        columns = int(vehicle_dim['length'] / box_dimensions.length)
-        layers = int(vehicle_dim['height'] / box_dimensions.height)
+        # Fill the slack around each rotation's main block with re-oriented
+        # boxes (guillotine cuts) and keep the rotation that fits the most
+        space_key = tuple(space.tolist())
+        totals = [_guillotine_count(space_key, tuple(oriented)) for oriented in rotated.tolist()]
         
-        # Calculate total boxes
-        total_boxes = rows * columns * layers
+        # Ties keep the given orientation; rows/columns/layers describe the main block
+        best = int(np.argmax(totals))
+        rows, columns, layers = (int(n) for n in fits[best])
+        total_boxes = totals[best]
         
         # Calculate space utilization
         vehicle_volume = vehicle_dim['length'] * vehicle_dim['width'] * vehicle_dim['height']
@@ -141,10 +451,51 @@ class EmissionCalculator:
             rows=rows,
             columns=columns,
             layers=layers,
+            extra_boxes=total_boxes - rows * columns * layers,
             utilization_percentage=utilization,
             remaining_space=remaining_space
         )
 
+    def calculate_emissions(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        weight: float,
+        material: str = "Paper and board: board"
+    ) -> EmissionResult:
+        """
+        Calculate emissions for a direct road shipment.
+        
+        Results are cached; coordinates are rounded to 6 decimal places and
+        weight to 3 so near-identical requests share an entry. The returned
+        result is shared between callers and must not be modified.
+        """
+        return self._emissions_cache(
+            round(origin[0], 6), round(origin[1], 6),
+            round(destination[0], 6), round(destination[1], 6),
+            round(weight, 3),
+            self._get_standardized_material(material)
+        )
+
+    def _calculate_emissions_uncached(
+        self,
+        origin_lat: float,
+        origin_lon: float,
+        dest_lat: float,
+        dest_lon: float,
+        weight: float,
+        material: str
+    ) -> EmissionResult:
+        return self.calculate_multi_modal_emissions(
+            route_segments=[{
+                'origin': (origin_lat, origin_lon),
+                'destination': (dest_lat, dest_lon),
+                'mode': 'road'
+            }],
+            weight=weight,
+            material=material
+        )
+
     def calculate_multi_modal_emissions(
         self,
         route_segments: List[Dict],
@@ -174,7 +525,7 @@ class EmissionCalculator:
         # Calculate emissions for each segment
         for segment in route_segments:
             # Calculate segment distance
-            distance = geodesic(segment['origin'], segment['destination']).kilometers
+            distance = haversine_km(segment['origin'], segment['destination'])
             total_distance += distance
 
             # Select best vehicle for this segment based on mode and distance
@@ -184,12 +535,11 @@ class EmissionCalculator:
                 mode=segment['mode']
             )
 
-            # Calculate segment emissions
+            # Calculate segment emissions with the selected vehicle's factor
             segment_emissions = self._calculate_transport_emissions(
                 distance=distance,
                 weight=weight,
-                vehicle=vehicle,
-                mode=segment['mode']
+                vehicle_data=vehicle
             )
 
             # Calculate estimated time for segment
@@ -199,16 +549,17 @@ class EmissionCalculator:
             # Add segment to results
             segments.append(TransportSegment(
                 mode=segment['mode'],
-                vehicle=vehicle,
+                vehicle=vehicle.level2,
                 distance=distance,
                 emissions=segment_emissions
             ))
 
             total_emissions += segment_emissions
 
-        # Calculate packaging and waste emissions
-        packaging_emissions = self._calculate_packaging_emissions(weight, material)
-        waste_emissions = self._calculate_waste_emissions(weight, material)
+        # Calculate packaging and waste emissions from a single material lookup
+        material_row = self._lookup_material_row(material)
+        packaging_emissions = self._calculate_packaging_emissions(weight, material_row)
+        waste_emissions = self._calculate_waste_emissions(weight)
 
         # Calculate box information if dimensions provided
         box_info = None
@@ -249,80 +600,94 @@ class EmissionCalculator:
             loading_info=loading_info
         )
 
+    def calculate_batch_emissions(
+        self,
+        shipments: pd.DataFrame,
+        mode: str = 'road'
+    ) -> pd.DataFrame:
+        """
+        Calculate emissions for many single-leg shipments at once.
+        
+        Args:
+            shipments: DataFrame with columns origin_lat, origin_lon, dest_lat,
+                dest_lon, weight (kg) and optionally material
+            mode: Transport mode used for every shipment
+        
+        Returns:
+            A copy of shipments with distance, vehicle and emission columns added
+        """
+        weight = shipments['weight'].to_numpy(dtype=np.float64)
+        distance = haversine_km_array(
+            shipments['origin_lat'].to_numpy(dtype=np.float64),
+            shipments['origin_lon'].to_numpy(dtype=np.float64),
+            shipments['dest_lat'].to_numpy(dtype=np.float64),
+            shipments['dest_lon'].to_numpy(dtype=np.float64)
+        )
+        
+        # Vehicle choice depends only on the mode, so the whole batch shares one
+        vehicle = self._select_best_vehicle(distance=0, weight=0, mode=mode)
+        transport = self._calculate_transport_emissions(
+            distance=distance,
+            weight=weight,
+            vehicle_data=vehicle
+        )
+        
+        # Resolve each distinct material once, then gather its factors by code
+        if 'material' in shipments:
+            materials = pd.Categorical(shipments['material'].fillna("Paper and board: board"))
+        else:
+            materials = pd.Categorical(["Paper and board: board"] * len(shipments))
+        material_rows = [self._lookup_material_row(material) for material in materials.categories]
+        for material_row in material_rows:
+            if math.isnan(material_row.ghg):
+                raise ValueError(f"Invalid GHG Conversion Factor for material '{material_row.level3}'")
+        weight_mult = np.array([row.weight_mult for row in material_rows])[materials.codes]
+        ghg_factor = np.array([row.ghg for row in material_rows])[materials.codes]
+        packaging = weight * 0.1 * weight_mult * ghg_factor
+        waste = self._calculate_waste_emissions(weight)
+        
+        result = shipments.copy()
+        result['distance_km'] = distance
+        result['vehicle'] = vehicle.level2
+        result['transport_co2e'] = transport
+        result['packaging_co2e'] = packaging
+        result['waste_co2e'] = waste
+        result['total_co2e'] = transport + packaging + waste
+        return result
+
     def _select_best_vehicle(
         self,
         distance: float,
         weight: float,
         mode: str
-    ) -> str:
+    ) -> FactorRow:
         """Select the most efficient vehicle based on mode, distance and weight."""
-        # Filter for vehicles of the specified mode
-        mode_mapping = {
-            'road': 'Road',
-            'sea': 'Water',
-            'air': 'Air',
-            'rail': 'Rail'
-        }
-
-        transport_vehicles = self.delivery_modes[
-            self.delivery_modes['Level 1'].str.contains(mode_mapping[mode], case=False, na=False)
-        ]
+        # Lowest-emission vehicle row for the mode, resolved at load time
+        best_vehicle = self._best_vehicle_by_mode.get(mode)
 
-        if transport_vehicles.empty:
+        if best_vehicle is None:
             raise ValueError(f"No vehicles found for mode: {mode}")
-
-        # Convert weight to tonnes for comparison
-        weight_tonnes = weight / 1000
-
-        # Filter vehicles by weight capacity
-        valid_vehicles = transport_vehicles.copy()
-
-        # Select vehicle with lowest emissions
-        valid_vehicles['GHG_numeric'] = pd.to_numeric(
-            valid_vehicles['GHG Conversion Factor 2024'],
-            errors='coerce'
-        ).fillna(float('inf'))
-
-        best_vehicle = valid_vehicles.loc[valid_vehicles['GHG_numeric'].idxmin()]
         
-        return best_vehicle['Level 2']
+        return best_vehicle
 
     def _calculate_segment_time(self, distance: float, mode: str) -> float:
         """Calculate estimated time for segment in hours."""
-        # Average speeds in km/h
-        speeds = {
-            'road': 60,  # Truck average speed
-            'rail': 80,  # Train average speed
-            'sea': 30,   # Ship average speed
-            'air': 800   # Plane average speed
-        }
-        return distance / speeds[mode]
+        return distance / self.mode_characteristics[mode]['speed']
 
     def _calculate_transport_emissions(
         self,
         distance: float,
         weight: float,
-        vehicle: str
+        vehicle_data: FactorRow
     ) -> float:
-        """Calculate emissions from transport."""
-        # Try to find the vehicle in Level 3 first, then Level 2
-        vehicle_data = self.delivery_modes[
-            (self.delivery_modes['Level 3'] == vehicle) | 
-            (self.delivery_modes['Level 2'] == vehicle)
-        ]
-        
-        if vehicle_data.empty:
-            raise ValueError(f"Vehicle type '{vehicle}' not found in database")
-        
-        vehicle_data = vehicle_data.iloc[0]
-        
+        """Calculate emissions from transport using the selected vehicle's factor row."""
         # Use the 2024 conversion factor instead of GHG/Unit
-        ghg_per_unit = pd.to_numeric(vehicle_data['GHG Conversion Factor 2024'], errors='coerce')
-        if pd.isna(ghg_per_unit):
-            raise ValueError(f"Invalid GHG Conversion Factor for vehicle type '{vehicle}'")
+        ghg_per_unit = vehicle_data.ghg
+        if math.isnan(ghg_per_unit):
+            raise ValueError(f"Invalid GHG Conversion Factor for vehicle type '{vehicle_data.level2}'")
         
         # Get the UOM to determine calculation method
-        uom = str(vehicle_data['UOM']).lower()
+        uom = vehicle_data.uom
         
         # Calculate emissions based on UOM
         if 'tonne.km' in uom:
@@ -338,133 +703,77 @@ class EmissionCalculator:
 
     def _get_standardized_material(self, material: str) -> str:
         """Map common material names to database categories."""
-        material_mapping = {
-            'cardboard': 'Paper and board: board',
-            'paper': 'Paper and board: paper',
-            'mixed paper': 'Paper and board: mixed',
-            'plastic': 'Plastics: average plastics',
-            'plastic film': 'Plastics: average plastic film',
-            'plastic rigid': 'Plastics: average plastic rigid',
-            'metal': 'Metal: scrap metal',
-            'aluminum': 'Metal: aluminium cans and foil (excl. forming)',
-            'steel': 'Metal: steel cans',
-            'glass': 'Glass',
-            'wood': 'Wood'
-        }
-        
-        # First try direct mapping
-        material_lower = material.lower()
-        if material_lower in material_mapping:
-            return material_mapping[material_lower]
-        
-        # If not in mapping, return as is (might be using exact database name)
-        return material
+        # Names not in the mapping are returned as is (might be exact database names)
+        return self._MATERIAL_MAP.get(material.lower(), material)
+
+    def _find_material(self, std_material: str) -> Optional[FactorRow]:
+        """Return the first material whose Level 2 or Level 3 name contains std_material."""
+        needle = std_material.lower()
+        return next(
+            (row for level2, level3, row in self._material_factors
+             if needle in level2 or needle in level3),
+            None
+        )
 
-    def _calculate_packaging_emissions(
-        self,
-        weight: float,
-        material: str
-    ) -> float:
-        """Calculate emissions from packaging."""
+    def _lookup_material_row(self, material: str) -> FactorRow:
+        """Resolve a material name to its row in the materials sheet (Sheet1)."""
         # Get standardized material name
         std_material = self._get_standardized_material(material)
         
-        # Find material in the materials sheet (Sheet1)
-        material_data = self.materials[
-            (self.materials['Level 2'].str.contains(std_material, case=False, na=False)) |
-            (self.materials['Level 3'].str.contains(std_material, case=False, na=False))
-        ]
-        
-        if material_data.empty:
-            # If not found, show available options
-            print("\nAvailable materials:")
-            print("Level 2 categories:", self.materials['Level 2'].dropna().unique())
-            print("\nLevel 3 categories:", self.materials['Level 3'].dropna().unique())
-            raise ValueError(f"Material '{material}' (standardized as '{std_material}') not found in database")
+        material_row = self._material_rows.get(std_material)
+        if material_row is not None:
+            return material_row
         
-        material_data = material_data.iloc[0]
+        material_row = self._find_material(std_material)
         
-        # Use GHG Conversion Factor 2024 for calculation
-        ghg_factor = pd.to_numeric(material_data['GHG Conversion Factor 2024'], errors='coerce')
-        if pd.isna(ghg_factor):
-            raise ValueError(f"Invalid GHG Conversion Factor for material '{std_material}'")
-        
-        # Assume packaging weight is 10% of shipment weight
-        packaging_weight = weight * 0.1
-        
-        # Check UOM to determine calculation method
-        uom = str(material_data['UOM']).lower()
-        if 'tonne' in uom:
-            # Convert weight to tonnes
-            packaging_weight = packaging_weight / 1000
+        if material_row is None:
+            # If not found, log available options
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Available materials: Level 2 %s, Level 3 %s",
+                    self.materials['Level 2'].dropna().unique().tolist(),
+                    self.materials['Level 3'].dropna().unique().tolist()
+                )
+            raise ValueError(f"Material '{material}' (standardized as '{std_material}') not found in database")
         
-        return packaging_weight * ghg_factor
+        self._material_rows[std_material] = material_row
+        return material_row
 
-    def _calculate_waste_emissions(
+    def _calculate_packaging_emissions(
         self,
         weight: float,
-        material: str
+        material_data: FactorRow
     ) -> float:
-        """Calculate emissions from waste disposal."""
-        # Get standardized material name
-        std_material = self._get_standardized_material(material)
-        
-        # Find material in the materials sheet
-        material_data = self.materials[
-            (self.materials['Level 2'].str.contains(std_material, case=False, na=False)) |
-            (self.materials['Level 3'].str.contains(std_material, case=False, na=False))
-        ]
-        
-        if material_data.empty:
-            raise ValueError(f"Material '{std_material}' not found in database")
-        
-        material_data = material_data.iloc[0]
-        
-        # Find waste disposal method in Sheet2
-        # First, let's print available waste categories for debugging
-        print("\nAvailable waste categories:")
-        print("Level 1:", self.waste_methods['Level 1'].dropna().unique())
-        print("Level 2:", self.waste_methods['Level 2'].dropna().unique())
-        print("Level 3:", self.waste_methods['Level 3'].dropna().unique())
-        
-        # Try to find a matching waste category for paper/board
-        waste_data = self.waste_methods[
-            (self.waste_methods['Level 2'].str.contains('Paper', case=False, na=False)) |
-            (self.waste_methods['Level 2'].str.contains('Board', case=False, na=False)) |
-            (self.waste_methods['Level 3'].str.contains('Paper', case=False, na=False)) |
-            (self.waste_methods['Level 3'].str.contains('Board', case=False, na=False))
-        ]
-        
-        if waste_data.empty:
-            # If no specific paper/board waste method found, try to find general recycling/waste
-            waste_data = self.waste_methods[
-                (self.waste_methods['Level 2'].str.contains('Waste', case=False, na=False)) |
-                (self.waste_methods['Level 2'].str.contains('Disposal', case=False, na=False))
-            ]
+        """Calculate emissions from packaging."""
+        # Use GHG Conversion Factor 2024 for calculation
+        ghg_factor = material_data.ghg
+        if math.isnan(ghg_factor):
+            raise ValueError(f"Invalid GHG Conversion Factor for material '{material_data.level3}'")
         
-        if waste_data.empty:
-            print("\nNo suitable waste disposal method found. Available methods:")
-            print(self.waste_methods[['Level 1', 'Level 2', 'Level 3']].to_string())
+        # Assume packaging weight is 10% of shipment weight, in the UOM's unit
+        return weight * 0.1 * material_data.weight_mult * ghg_factor
+
+    def _calculate_waste_emissions(self, weight: float) -> float:
+        """Calculate emissions from waste disposal."""
+        # Waste disposal method from Sheet2, resolved at load time
+        waste_data = self._waste_row
+        
+        if waste_data is None:
+            logger.warning("No suitable waste disposal method found")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Available waste methods:\n%s",
+                    self.waste_methods[['Level 1', 'Level 2', 'Level 3']].to_string()
+                )
             return 0  # Return 0 emissions if no suitable method found
         
-        # Use the first matching waste method
-        waste_data = waste_data.iloc[0]
-        
         # Use GHG Conversion Factor 2024 for calculation
-        ghg_factor = pd.to_numeric(waste_data['GHG Conversion Factor 2024'], errors='coerce')
-        if pd.isna(ghg_factor):
+        ghg_factor = waste_data.ghg
+        if math.isnan(ghg_factor):
             return 0  # Return 0 emissions if no valid conversion factor
         
-        # Assume packaging weight is 10% of shipment weight
-        packaging_weight = weight * 0.1
-        
-        # Check UOM to determine calculation method
-        uom = str(waste_data['UOM']).lower()
-        if 'tonne' in uom:
-            # Convert weight to tonnes
-            packaging_weight = packaging_weight / 1000
-        
-        return packaging_weight * ghg_factor
+        # Assume packaging weight is 10% of shipment weight, in the UOM's unit
+        return weight * 0.1 * waste_data.weight_mult * ghg_factor
 
     def generate_route_options(
         self,
@@ -473,7 +782,7 @@ class EmissionCalculator:
         weight: float
     ) -> Dict[str, RouteOption]:
         """Generate three route options: Eco, Standard, and Express."""
-        distance = geodesic(origin, destination).kilometers
+        distance = haversine_km(origin, destination)
         
         # Generate different routing options based on distance
         options = {
@@ -498,35 +807,37 @@ class EmissionCalculator:
             })
         else:
             # Long distance: Combine sea and rail/road
-            midpoint = self._calculate_midpoint(origin, destination)
+            origin_port = self._find_nearest_port(origin)
+            destination_port = self._find_nearest_port(destination)
             segments.extend([
                 {
                     'mode': 'road',
                     'origin': origin,
-                    'destination': self._find_nearest_port(origin),
+                    'destination': origin_port,
                     'description': 'Road transport to port'
                 },
                 {
                     'mode': 'sea',
-                    'origin': self._find_nearest_port(origin),
-                    'destination': self._find_nearest_port(destination),
+                    'origin': origin_port,
+                    'destination': destination_port,
                     'description': 'Sea freight'
                 },
                 {
                     'mode': 'road',
-                    'origin': self._find_nearest_port(destination),
+                    'origin': destination_port,
                     'destination': destination,
                     'description': 'Road transport from port'
                 }
             ])
         
+        total_time, total_distance, estimated_emissions = self._summarize_segments(segments)
         return RouteOption(
             name="Eco-Friendly Route",
             description="Optimized for lowest emissions using rail and sea transport",
             segments=segments,
-            total_time=self._calculate_route_time(segments),
-            total_distance=self._calculate_route_distance(segments),
-            estimated_emissions=self._estimate_route_emissions(segments),
+            total_time=total_time,
+            total_distance=total_distance,
+            estimated_emissions=estimated_emissions,
             cost_factor=0.8
         )
 
@@ -560,13 +871,14 @@ class EmissionCalculator:
                 }
             ])
         
+        total_time, total_distance, estimated_emissions = self._summarize_segments(segments)
         return RouteOption(
             name="Standard Route",
             description="Balanced option using road and rail transport",
             segments=segments,
-            total_time=self._calculate_route_time(segments),
-            total_distance=self._calculate_route_distance(segments),
-            estimated_emissions=self._estimate_route_emissions(segments),
+            total_time=total_time,
+            total_distance=total_distance,
+            estimated_emissions=estimated_emissions,
             cost_factor=1.0
         )
 
@@ -584,34 +896,37 @@ class EmissionCalculator:
             })
         else:
             # Long distance: Air transport
+            origin_airport = self._find_nearest_airport(origin)
+            destination_airport = self._find_nearest_airport(destination)
             segments.extend([
                 {
                     'mode': 'road',
                     'origin': origin,
-                    'destination': self._find_nearest_airport(origin),
+                    'destination': origin_airport,
                     'description': 'Road transport to airport'
                 },
                 {
                     'mode': 'air',
-                    'origin': self._find_nearest_airport(origin),
-                    'destination': self._find_nearest_airport(destination),
+                    'origin': origin_airport,
+                    'destination': destination_airport,
                     'description': 'Air freight'
                 },
                 {
                     'mode': 'road',
-                    'origin': self._find_nearest_airport(destination),
+                    'origin': destination_airport,
                     'destination': destination,
                     'description': 'Road transport from airport'
                 }
             ])
         
+        total_time, total_distance, estimated_emissions = self._summarize_segments(segments)
         return RouteOption(
             name="Express Route",
             description="Fastest option using air transport for long distances",
             segments=segments,
-            total_time=self._calculate_route_time(segments),
-            total_distance=self._calculate_route_distance(segments),
-            estimated_emissions=self._estimate_route_emissions(segments),
+            total_time=total_time,
+            total_distance=total_distance,
+            estimated_emissions=estimated_emissions,
             cost_factor=2.5
         )
 
@@ -623,36 +938,37 @@ class EmissionCalculator:
             (point1[1] + point2[1]) / 2
         )
 
-    def _calculate_route_time(self, segments):
-        """Calculate total route time in hours."""
-        total_time = 0
+    def _summarize_segments(self, segments):
+        """Total time (hours), distance (km) and estimated emissions (relative
+        units) of a route, computing each segment's distance once."""
+        total_time = total_distance = total_emissions = 0.0
         for segment in segments:
-            distance = geodesic(segment['origin'], segment['destination']).kilometers
-            speed = self.mode_characteristics[segment['mode']]['speed']
-            total_time += distance / speed
-        return total_time
-
-    def _calculate_route_distance(self, segments):
-        """Calculate total route distance in kilometers."""
-        total_distance = 0
-        for segment in segments:
-            distance = geodesic(segment['origin'], segment['destination']).kilometers
+            distance = haversine_km(segment['origin'], segment['destination'])
+            characteristics = self.mode_characteristics[segment['mode']]
+            total_time += distance / characteristics['speed']
             total_distance += distance
-        return total_distance
-
-    def _estimate_route_emissions(self, segments):
-        """Estimate route emissions (relative units)."""
-        total_emissions = 0
-        for segment in segments:
-            distance = geodesic(segment['origin'], segment['destination']).kilometers
-            emission_factor = self.mode_characteristics[segment['mode']]['emission_factor']
-            total_emissions += distance * emission_factor
-        return total_emissions
+            total_emissions += distance * characteristics['emission_factor']
+        return total_time, total_distance, total_emissions
 
     def _find_nearest_port(self, location):
-        # Implementation of _find_nearest_port method
-        pass
+        """Coordinates of the seaport closest to a location."""
+        return self._nearest_hub_cache('port', round(location[0], 6), round(location[1], 6))
 
     def _find_nearest_airport(self, location):
-        # Implementation of _find_nearest_airport method
-        pass
+        """Coordinates of the cargo airport closest to a location."""
+        return self._nearest_hub_cache('airport', round(location[0], 6), round(location[1], 6))
+
+    def _nearest_hub(self, kind: str, lat: float, lon: float) -> Tuple[float, float]:
+        hubs = self._hubs[kind]
+        nearest = int(np.argmin(haversine_km_array(lat, lon, hubs[:, 0], hubs[:, 1])))
+        return tuple(hubs[nearest].tolist())
+
+
+_shared_calculator: Optional[EmissionCalculator] = None
+
+def get_calculator() -> EmissionCalculator:
+    """Return a process-wide calculator so the sheets are loaded only once."""
+    global _shared_calculator
+    if _shared_calculator is None:
+        _shared_calculator = EmissionCalculator()
+    return _shared_calculator
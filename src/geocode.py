@@ -0,0 +1,185 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+import logging
+import math
+import sqlite3
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from time import monotonic, sleep
+
+logger = logging.getLogger(__name__)
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+
+class Geocoder:
+    """Resolve "lat,lon" strings or place names to coordinates.
+
+    Coordinates are parsed locally. Place names are looked up on Nominatim,
+    with results cached in memory and in a SQLite file in data_dir. The HTTP
+    session and the cache file are only set up once a place name needs
+    geocoding.
+    """
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = Path(data_dir)
+        self._cached_geocode = lru_cache(maxsize=4096)(self._geocode_uncached)
+        self._setup_lock = threading.Lock()
+        self._http: Optional[requests.Session] = None
+        self._cache_db: Optional[Path] = None
+        self._cache_checked = False
+        
+        # Nominatim allows one request per second; concurrent lookups queue on
+        # this lock so their round-trips can overlap while starts stay spaced
+        self._rate_lock = threading.Lock()
+        self._next_request_at = 0.0
+
+    def parse_location(self, location_str: str) -> Optional[Tuple[float, float]]:
+        """Parse location string into coordinates."""
+        # First, check if it's already in coordinate format
+        parts = location_str.split(',')
+        if len(parts) == 2:
+            try:
+                lat, lon = float(parts[0]), float(parts[1])
+            except ValueError:
+                pass
+            else:
+                if math.isfinite(lat) and math.isfinite(lon):
+                    return (lat, lon)
+        
+        # If not coordinates, try to geocode the location name
+        try:
+            return self.geocode(location_str)
+        except Exception as e:
+            logger.warning("Geocoding error: %s", e)
+            return None
+
+    def parse_many(self, locations: List[str]) -> List[Optional[Tuple[float, float]]]:
+        """Parse several locations concurrently, preserving input order."""
+        if len(locations) < 2:
+            return [self.parse_location(location) for location in locations]
+        with ThreadPoolExecutor(max_workers=len(locations)) as executor:
+            return list(executor.map(self.parse_location, locations))
+
+    def geocode(self, location_name: str) -> Optional[Tuple[float, float]]:
+        """Convert location name to coordinates, using the cache when possible."""
+        query = location_name.strip().casefold()
+        if not query:
+            return None
+        
+        try:
+            return self._cached_geocode(query)
+        except requests.exceptions.RequestException as e:
+            # Failed requests raise, so they are never stored in the cache
+            logger.warning("Error during geocoding: %s", e)
+            return None
+
+    def _cache_path(self) -> Optional[Path]:
+        """Create the SQLite cache on first use; None if it can't be opened."""
+        with self._setup_lock:
+            if not self._cache_checked:
+                self._cache_checked = True
+                cache_db = self.data_dir / "geocode_cache.db"
+                try:
+                    with closing(sqlite3.connect(cache_db)) as conn, conn:
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS geocode "
+                            "(query TEXT PRIMARY KEY, lat REAL, lon REAL)"
+                        )
+                    self._cache_db = cache_db
+                except sqlite3.Error as e:
+                    # The disk cache is optional; lookups still use the memory cache
+                    logger.warning("Geocode cache disabled: %s", e)
+            return self._cache_db
+
+    def _session(self) -> requests.Session:
+        """HTTP session for Nominatim, created on the first request."""
+        with self._setup_lock:
+            if self._http is None:
+                # Reuse one session so keep-alive connections are pooled across
+                # lookups; rate-limited (429) and transient gateway errors are
+                # retried with backoff
+                http = requests.Session()
+                http.headers.update({'User-Agent': 'CarbonFootprintCalculator/1.0'})
+                retries = Retry(
+                    total=3,
+                    backoff_factor=0.5,
+                    status_forcelist=(429, 502, 503, 504),
+                    allowed_methods=frozenset(['GET'])
+                )
+                http.mount('https://', HTTPAdapter(
+                    pool_connections=4, pool_maxsize=10, max_retries=retries
+                ))
+                self._http = http
+            return self._http
+
+    def _geocode_uncached(self, query: str) -> Optional[Tuple[float, float]]:
+        """Look up a normalized query in the on-disk cache, then Nominatim."""
+        cache_db = self._cache_path()
+        if cache_db is not None:
+            try:
+                with closing(sqlite3.connect(cache_db)) as conn:
+                    row = conn.execute(
+                        "SELECT lat, lon FROM geocode WHERE query = ?", (query,)
+                    ).fetchone()
+                if row:
+                    return (row[0], row[1])
+            except sqlite3.Error as e:
+                logger.warning("Geocode cache read failed: %s", e)
+        
+        coordinates = self._request_geocode(query)
+        if coordinates and cache_db is not None:
+            try:
+                with closing(sqlite3.connect(cache_db)) as conn, conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO geocode (query, lat, lon) VALUES (?, ?, ?)",
+                        (query, coordinates[0], coordinates[1])
+                    )
+            except sqlite3.Error as e:
+                logger.warning("Geocode cache write failed: %s", e)
+        return coordinates
+
+    def _request_geocode(self, query: str) -> Optional[Tuple[float, float]]:
+        """Convert location name to coordinates using Nominatim API."""
+        http = self._session()
+        
+        # Space requests at least a second apart to respect Nominatim's usage policy
+        with self._rate_lock:
+            delay = self._next_request_at - monotonic()
+            if delay > 0:
+                sleep(delay)
+            self._next_request_at = monotonic() + 1
+        
+        params = {
+            'q': query,
+            'format': 'json',
+            'limit': 1,
+            'accept-language': 'en'
+        }
+        
+        # User agent (required by Nominatim's usage policy) is set on the session
+        response = http.get(NOMINATIM_URL, params=params, timeout=(3.05, 10))
+        response.raise_for_status()
+        
+        results = response.json()
+        
+        if results:
+            # Get the first result
+            location = results[0]
+            return (float(location['lat']), float(location['lon']))
+        
+        return None
+
+
+_shared_geocoder: Optional[Geocoder] = None
+
+def get_geocoder() -> Geocoder:
+    """Return a process-wide geocoder so caches and the rate limit are shared."""
+    global _shared_geocoder
+    if _shared_geocoder is None:
+        _shared_geocoder = Geocoder()
+    return _shared_geocoder
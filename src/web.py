@@ -1,14 +1,15 @@
-from flask import Flask, render_template, request, jsonify, session
-from .core import EmissionCalculator
+from flask import Flask, Response, render_template, request, jsonify, session
+import orjson
+from .core import get_calculator
 from .chatbot import RecommendationChatbot
-import uuid
+import secrets
 
 app = Flask(__name__)
 # Add a secret key for session management
 app.secret_key = 'your-super-secret-key-here'  # In production, use a secure random key
 
 # Initialize calculator and chatbot
-calculator = EmissionCalculator()
+calculator = get_calculator()
 chatbot = RecommendationChatbot()
 
 @app.route('/')
@@ -60,13 +61,18 @@ def calculate():
                     'rows': info.rows,
                     'columns': info.columns,
                     'layers': info.layers,
+                    'extra_boxes': info.extra_boxes,
                     'utilization_percentage': info.utilization_percentage,
                     'remaining_space': round(info.remaining_space, 3)
                 }
                 for vehicle, info in result.loading_info.items()
             }
         
-        return jsonify(response)
+        # orjson encodes the payload much faster than Flask's stdlib-based jsonify
+        return Response(
+            orjson.dumps(response, option=orjson.OPT_SERIALIZE_NUMPY),
+            mimetype='application/json'
+        )
 
     except Exception as e:
         return jsonify({
@@ -84,11 +90,17 @@ def chat_message():
     """Handle chat messages."""
     data = request.json
     message = data.get('message', '').strip()
+    session_id = session.get('session_id')
     
-    if 'session_id' not in session:
-        session['session_id'] = str(uuid.uuid4())
+    if session_id is None:
+        # The empty message sent on page load only needs the greeting, so
+        # don't create a session or conversation state until the user replies
+        if not message:
+            return jsonify({'response': chatbot.get_welcome_message()})
+        session['session_id'] = session_id = secrets.token_hex(8)
+        chatbot.initialize_conversation(session_id)
     
-    response = chatbot.handle_message(session['session_id'], message)
+    response = chatbot.handle_message(session_id, message)
     return jsonify({'response': response})
 
 if __name__ == '__main__':
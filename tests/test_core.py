@@ -0,0 +1,136 @@
+from contextlib import closing
+from pathlib import Path
+from unittest import mock
+import sqlite3
+
+import pandas as pd
+import pytest
+import requests
+
+from src.core import BoxDimensions, EmissionCalculator, _fits
+from src.geocode import Geocoder
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+LONDON = (51.5074, -0.1278)
+
+
+@pytest.fixture(scope="module")
+def calculator():
+    return EmissionCalculator(DATA_DIR)
+
+
+def box(length, width, height):
+    return BoxDimensions(length=length, width=width, height=height,
+                         volume=length * width * height)
+
+
+# Box loading
+
+def test_fit_counts_tolerate_float_division():
+    # 2.0 // 0.4 is 4.0 in floating point; the van fits five boxes across
+    assert 2.0 // 0.4 == 4.0
+    assert _fits((2.0, 4.0, 1.8), (0.4, 0.4, 0.6)) == (5, 10, 3)
+
+
+def test_box_loading_fills_van_exactly(calculator):
+    # 0.6 x 0.4 x 0.4 m boxes tile the 4.0 x 2.0 x 1.8 m van completely
+    loading = calculator.calculate_box_loading(box(0.6, 0.4, 0.4), 'Vans')
+    assert loading.total_boxes == 150
+    assert (loading.rows, loading.columns, loading.layers) == (5, 10, 3)
+    assert loading.extra_boxes == 0
+    assert loading.utilization_percentage == pytest.approx(100.0)
+
+
+def test_box_loading_tries_rotations(calculator):
+    # Only fits when the 1.9 m side runs across the 2.0 m van width
+    loading = calculator.calculate_box_loading(box(1.0, 1.9, 0.5), 'Vans')
+    assert loading.total_boxes == 12
+    assert (loading.rows, loading.columns, loading.layers) == (1, 4, 3)
+
+
+def test_box_loading_reports_boxes_outside_main_grid(calculator):
+    loading = calculator.calculate_box_loading(box(0.45, 0.35, 0.25), 'Freight flights')
+    assert (loading.rows, loading.columns, loading.layers) == (4, 9, 8)
+    assert loading.extra_boxes == 56
+    assert loading.total_boxes == 4 * 9 * 8 + 56
+
+
+# Batch emissions
+
+def test_batch_matches_single_leg_calculation(calculator):
+    shipments = pd.DataFrame({
+        'origin_lat': [51.5074, 48.8566, 40.4168],
+        'origin_lon': [-0.1278, 2.3522, -3.7038],
+        'dest_lat': [48.8566, 40.4168, 41.9],
+        'dest_lon': [2.3522, -3.7038, 12.5],
+        'weight': [100.0, 250.0, 10.0],
+        'material': ['Cardboard', 'plastic', None]
+    })
+    result = calculator.calculate_batch_emissions(shipments, mode='rail')
+    
+    for row in result.itertuples():
+        single = calculator.calculate_multi_modal_emissions(
+            route_segments=[{
+                'mode': 'rail',
+                'origin': (row.origin_lat, row.origin_lon),
+                'destination': (row.dest_lat, row.dest_lon)
+            }],
+            weight=row.weight,
+            material=row.material if isinstance(row.material, str) else "Paper and board: board"
+        )
+        assert row.vehicle == single.segments[0].vehicle
+        assert row.distance_km == pytest.approx(single.total_distance)
+        assert row.transport_co2e == pytest.approx(single.breakdown['transport'])
+        assert row.packaging_co2e == pytest.approx(single.breakdown['packaging'])
+        assert row.waste_co2e == pytest.approx(single.breakdown['waste'])
+        assert row.total_co2e == pytest.approx(single.co2e)
+
+
+# Freight hubs
+
+def test_nearest_hubs_to_london(calculator):
+    assert calculator._find_nearest_port(LONDON) == (50.9, -1.43)          # Southampton
+    assert calculator._find_nearest_airport(LONDON) == (51.47, -0.4543)    # Heathrow
+
+
+# Geocoder
+
+def nominatim_response(results):
+    response = mock.Mock()
+    response.json.return_value = results
+    response.raise_for_status.return_value = None
+    return response
+
+
+def test_geocoder_parses_coordinates_without_http(tmp_path):
+    with mock.patch.object(requests.Session, 'get') as get:
+        assert Geocoder(tmp_path).parse_location("51.5,-0.12") == (51.5, -0.12)
+    get.assert_not_called()
+    assert not (tmp_path / "geocode_cache.db").exists()
+
+
+def test_geocoder_cache_hit_skips_http(tmp_path):
+    paris = [{'lat': '48.8566', 'lon': '2.3522'}]
+    with mock.patch.object(requests.Session, 'get', return_value=nominatim_response(paris)) as get:
+        assert Geocoder(tmp_path).geocode("Paris") == (48.8566, 2.3522)
+        assert get.call_count == 1
+        
+        # A fresh geocoder has an empty memory cache, so this is served by SQLite
+        assert Geocoder(tmp_path).geocode(" paris ") == (48.8566, 2.3522)
+        assert get.call_count == 1
+
+
+def test_geocoder_does_not_store_missing_places(tmp_path):
+    with mock.patch.object(requests.Session, 'get', return_value=nominatim_response([])):
+        assert Geocoder(tmp_path).geocode("Nowhere") is None
+    
+    with closing(sqlite3.connect(tmp_path / "geocode_cache.db")) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0] == 0
+
+
+def test_geocoder_works_without_a_writable_cache(tmp_path):
+    paris = [{'lat': '48.8566', 'lon': '2.3522'}]
+    geocoder = Geocoder(tmp_path / "missing" / "dir")
+    with mock.patch.object(requests.Session, 'get', return_value=nominatim_response(paris)):
+        assert geocoder.geocode("Paris") == (48.8566, 2.3522)
+    assert not (tmp_path / "missing").exists()